@@ -1,35 +1,155 @@
+import asyncio
+import aiohttp
+import numpy as np
+import orjson
 import requests
+from aiolimiter import AsyncLimiter
+from diskcache import Cache
+from requests.adapters import HTTPAdapter
 from time import sleep
+from urllib3.util.retry import Retry
 
 # Open Street Maps Geocoding API endpoint
 GEOCODING_API_URL = "https://nominatim.openstreetmap.org/reverse"
 
+# Limite de requisições por segundo (política do Nominatim público; pode ser maior em instância própria)
+MAX_REQUESTS_PER_SECOND = 1
 
-def geocode_reverse(lat, lon, cache={}):
+# Fator de quantização das coordenadas (1e5 ≈ 1 m): pontos muito próximos compartilham a mesma chave de cache
+COORD_PRECISION = 1e5
+
+# Cache persistente em disco (LRU limitado a 256 MB): resultados sobrevivem entre execuções do script
+CACHE = Cache('./.geocache', size_limit=256 << 20)
+CACHE_EXPIRE = 30 * 86400  # 30 dias
+_MISSING = object()
+
+# Cache em memória à frente do cache em disco; assim como ele, só guarda consultas bem-sucedidas
+_ROAD_CACHE = {}
+
+# Sessão HTTP compartilhada: reaproveita as conexões TCP/TLS entre as consultas
+_SESSION = requests.Session()
+_SESSION.headers.update({'User-Agent': 'BusRouteApp/1.0 (meuemail@example.com)'})
+_SESSION.mount('https://', HTTPAdapter(
+    pool_connections=4,
+    pool_maxsize=20,
+    max_retries=Retry(total=3, backoff_factor=0.5, status_forcelist=[429, 500, 502, 503, 504],
+                      raise_on_status=False)
+))
+
+
+def _quantize(lat, lon):
     """
-    Consulta geocodificação reversa da API OpenStreetMap, com cache para evitar múltiplas chamadas.
+    Converte a coordenada em inteiros na grade de COORD_PRECISION, eliminando ruído de ponto flutuante.
     """
+    return round(lat * COORD_PRECISION), round(lon * COORD_PRECISION)
+
+
+def _get_cached_road(lat_q, lon_q):
+    """
+    Procura a rua de uma coordenada quantizada nos caches em memória e em disco.
+    Retorna _MISSING se a coordenada ainda não foi consultada com sucesso.
+    """
+    if (lat_q, lon_q) in _ROAD_CACHE:
+        return _ROAD_CACHE[(lat_q, lon_q)]
+
+    road = CACHE.get(('geocode_reverse', lat_q, lon_q), default=_MISSING)
+    if road is not _MISSING:
+        _ROAD_CACHE[(lat_q, lon_q)] = road
+    return road
+
+
+def _nominatim_params(lat_q, lon_q):
+    """
+    Parâmetros da consulta ao Nominatim para uma coordenada quantizada.
+    """
+    return {'lat': lat_q / COORD_PRECISION, 'lon': lon_q / COORD_PRECISION, 'format': 'json'}
+
+
+def _parse_road(lat_q, lon_q, content):
+    """
+    Extrai o nome da rua de uma resposta bem-sucedida do Nominatim e o guarda nos caches.
+    Lança ValueError se o corpo não for um JSON válido.
+    """
+    road = orjson.loads(content).get('address', {}).get('road')
+    CACHE.set(('geocode_reverse', lat_q, lon_q), road, expire=CACHE_EXPIRE)
+    _ROAD_CACHE[(lat_q, lon_q)] = road
+    return road
+
+
+def _geocode_reverse_quantized(lat_q, lon_q):
+    """
+    Consulta a geocodificação reversa de uma coordenada quantizada (ver _quantize).
+    Usa os caches em memória e em disco antes de recorrer à API.
+    """
+    road = _get_cached_road(lat_q, lon_q)
+    if road is not _MISSING:
+        return road
+
     sleep(1)  # Pausa para respeitar a política de uso da API
-    if (lat, lon) in cache:
-        return cache[(lat, lon)]
-
-    headers = {
-        'User-Agent': 'BusRouteApp/1.0 (meuemail@example.com)'
-    }
-    url = f'{GEOCODING_API_URL}?lat={lat}&lon={lon}&format=json'
-    response = requests.get(url, headers=headers)
-
-    if response.status_code == 200:
-        try:
-            data = response.json()
-            road = data.get('address', {}).get('road')
-            cache[(lat, lon)] = road
-            return road
-        except ValueError:
-            pass
+
+    try:
+        response = _SESSION.get(GEOCODING_API_URL, params=_nominatim_params(lat_q, lon_q), timeout=10)
+        if response.status_code == 200:
+            return _parse_road(lat_q, lon_q, response.content)
+    except (requests.RequestException, ValueError) as e:
+        print(f"Erro na geocodificação de ({lat_q / COORD_PRECISION}, {lon_q / COORD_PRECISION}): {e}")
     return None
 
 
+def geocode_reverse(lat, lon):
+    """
+    Consulta geocodificação reversa da API OpenStreetMap, com cache para evitar múltiplas chamadas.
+    Coordenadas a menos de ~1 m uma da outra compartilham a mesma entrada do cache.
+    """
+    return _geocode_reverse_quantized(*_quantize(lat, lon))
+
+
+async def geocode_reverse_async(session, lat, lon, limiter):
+    """
+    Versão assíncrona de geocode_reverse, com os mesmos caches. O limiter controla a taxa de
+    requisições, permitindo que a próxima consulta seja disparada enquanto a anterior ainda aguarda resposta.
+    """
+    lat_q, lon_q = _quantize(lat, lon)
+    road = _get_cached_road(lat_q, lon_q)
+    if road is not _MISSING:
+        return road
+
+    try:
+        async with limiter:
+            async with session.get(GEOCODING_API_URL, params=_nominatim_params(lat_q, lon_q)) as response:
+                if response.status == 200:
+                    return _parse_road(lat_q, lon_q, await response.read())
+    except (aiohttp.ClientError, asyncio.TimeoutError, ValueError) as e:
+        print(f"Erro na geocodificação de ({lat}, {lon}): {e}")
+    return None
+
+
+async def get_street_itinerary(points):
+    """
+    Consulta a geocodificação reversa de vários pontos de forma concorrente.
+
+    :param points: Lista de coordenadas (longitude, latitude)
+    :return: Lista com o nome da rua de cada ponto, na mesma ordem de entrada.
+    """
+    # Pontos repetidos (ou a menos de ~1 m) são consultados uma única vez
+    keys = [_quantize(lat, lon) for lon, lat in points]
+    unique_keys = list(dict.fromkeys(keys))
+
+    limiter = AsyncLimiter(MAX_REQUESTS_PER_SECOND, 1)
+    connector = aiohttp.TCPConnector(limit=10, keepalive_timeout=30)
+    timeout = aiohttp.ClientTimeout(total=10)
+    headers = {'User-Agent': 'BusRouteApp/1.0 (meuemail@example.com)'}
+    async with aiohttp.ClientSession(connector=connector, timeout=timeout, headers=headers) as session:
+        tasks = [
+            geocode_reverse_async(session, lat_q / COORD_PRECISION, lon_q / COORD_PRECISION, limiter)
+            for lat_q, lon_q in unique_keys
+        ]
+        roads = await asyncio.gather(*tasks)
+
+    road_by_key = dict(zip(unique_keys, roads))
+    return [road_by_key[key] for key in keys]
+
+
 def get_correct_route(points):
     """
     Obtém as ruas do trajeto real do veículo, ignorando nomes de ruas inadequados ou cruzamentos.
@@ -37,29 +157,31 @@ def get_correct_route(points):
     :param points: Lista de coordenadas (longitude, latitude)
     :return: Lista de nomes das ruas pelas quais o veículo realmente passou.
     """
-    previous_street = None
-    street_names = []
-    for i, (lon, lat) in enumerate(points):
-        road_name = geocode_reverse(lat, lon)  # Consulta a rua utilizando geocodificação reversa
-
-        # Verifica se o ponto está consistente com as ruas anteriores/subsequentes
-        if road_name:
-            # Checar cruzamentos com base na sequência (descarta ruas não consistentes)
-            if i > 0 and i < len(points) - 1:  # Ponto intermediário
-                previous_point_street = street_names[-1] if len(street_names) > 0 else None
-                next_point_road = geocode_reverse(points[i + 1][1], points[i + 1][0])
-
-                # Se a rua atual diverge de ambas (anterior e posterior), ignora
-                if road_name != previous_point_street and road_name != next_point_road:
-                    print(f"Ignorando rua {road_name} em ({lat}, {lon}): possível cruzamento inconsistente.")
-                    continue
-
-            # Adiciona a rua ao itinerário
-            if road_name != previous_street:  # Nome da rua mudou
-                street_names.append(road_name)
-                previous_street = road_name
-
-    return street_names
+    # Consulta todas as ruas de uma vez (uma única consulta por ponto)
+    roads = np.array(asyncio.run(get_street_itinerary(points)), dtype=object)
+
+    # Rua do ponto anterior e do posterior (None nas extremidades)
+    previous_roads = np.empty_like(roads)
+    previous_roads[1:] = roads[:-1]
+    next_roads = np.empty_like(roads)
+    next_roads[:-1] = roads[1:]
+
+    # Se a rua atual diverge de ambas (anterior e posterior), é um possível cruzamento;
+    # os pontos das extremidades não são verificados
+    has_road = roads.astype(bool)
+    consistent = (roads == previous_roads) | (roads == next_roads)
+    consistent[:1] = consistent[-1:] = True
+
+    for i in np.flatnonzero(has_road & ~consistent):
+        lon, lat = points[i]
+        print(f"Ignorando rua {roads[i]} em ({lat}, {lon}): possível cruzamento inconsistente.")
+
+    # Adiciona ao itinerário apenas as mudanças de nome entre as ruas mantidas
+    kept_roads = roads[has_road & consistent]
+    changed = np.ones(len(kept_roads), dtype=bool)
+    changed[1:] = kept_roads[1:] != kept_roads[:-1]
+
+    return kept_roads[changed].tolist()
 
 
 # Coordenadas do itinerário
@@ -1,39 +1,57 @@
-import requests
+import asyncio
+import httpx
+import orjson
 import math
+import os
+import osmnx as ox
+from functools import lru_cache
+from shapely.geometry import LineString, Point
 
+# Grafo viário usado no map matching, baixado do OSM na primeira execução e reaproveitado do disco
+GRAFO_LUGAR = "Rio de Janeiro, Brazil"
+GRAFO_CAMINHO = "rio_de_janeiro_drive.graphml"
 
-def fazer_map_matching(coordenadas, api_key, profile="driving-car"):
-    """Faz o map matching dos pontos GPS usando a API do OpenRouteService."""
-    url = f"https://api.openrouteservice.org/v2/matching/{profile}/geojson"
 
-    # Formata as coordenadas para o formato esperado pela API
-    coordenadas_formatadas = [[lon, lat] for lat, lon in coordenadas]
+def carregar_grafo(lugar=GRAFO_LUGAR, caminho=GRAFO_CAMINHO):
+    """Carrega o grafo viário salvo em disco ou, se ainda não existir, baixa do OSM e salva."""
+    if os.path.exists(caminho):
+        return ox.load_graphml(caminho)
 
-    # Corpo da requisição
-    body = {
-        "coordinates": coordenadas_formatadas,
-        "geometry_simplify": "false",  # Mantém a geometria detalhada
-    }
+    grafo = ox.graph_from_place(lugar, network_type="drive")
+    ox.save_graphml(grafo, caminho)
+    return grafo
 
-    # Cabeçalhos da requisição
-    headers = {
-        "Authorization": api_key,
-        "Content-Type": "application/json"
-    }
 
-    # Faz a requisição POST
-    response = requests.post(url, json=body, headers=headers)
+def fazer_map_matching(grafo, coordenadas):
+    """
+    Faz o map matching dos pontos GPS localmente, projetando cada ponto na via mais próxima do grafo.
+    Retorna a lista de coordenadas corrigidas como tuplas (lat, lon).
+    """
+    lats = [lat for lat, lon in coordenadas]
+    lons = [lon for lat, lon in coordenadas]
 
-    if response.status_code == 200:
-        data = response.json()
-        return data
-    else:
-        print(f"Erro na requisição de map matching: {response.status_code}")
-        print(response.text)
-        return None
+    # Busca vetorizada (índice espacial) da aresta mais próxima de cada ponto
+    arestas = ox.distance.nearest_edges(grafo, X=lons, Y=lats)
+
+    coordenadas_corrigidas = []
+    for (u, v, k), lat, lon in zip(arestas, lats, lons):
+        aresta = grafo.edges[u, v, k]
+
+        # Arestas retas não têm geometria própria: usa o segmento entre os dois nós
+        geometria = aresta.get("geometry")
+        if geometria is None:
+            geometria = LineString([
+                (grafo.nodes[u]["x"], grafo.nodes[u]["y"]),
+                (grafo.nodes[v]["x"], grafo.nodes[v]["y"])
+            ])
+        ponto = geometria.interpolate(geometria.project(Point(lon, lat)))
+
+        coordenadas_corrigidas.append((ponto.y, ponto.x))
 
+    return coordenadas_corrigidas
 
-def obter_rota_openrouteservice(coordenadas, api_key, profile="driving-car"):
+
+async def obter_rota_openrouteservice(client, coordenadas, api_key, profile="driving-car"):
     """Obtém a rota e os nomes das ruas usando a API do OpenRouteService."""
     url = f"https://api.openrouteservice.org/v2/directions/{profile}/geojson"
 
@@ -54,10 +72,10 @@ def obter_rota_openrouteservice(coordenadas, api_key, profile="driving-car"):
     }
 
     # Faz a requisição POST
-    response = requests.post(url, json=body, headers=headers)
+    response = await client.post(url, content=orjson.dumps(body), headers=headers)
 
     if response.status_code == 200:
-        data = response.json()
+        data = orjson.loads(response.content)
         return data
     else:
         print(f"Erro na requisição de rota: {response.status_code}")
@@ -65,15 +83,27 @@ def obter_rota_openrouteservice(coordenadas, api_key, profile="driving-car"):
         return None
 
 
+@lru_cache(maxsize=4096)
+def _trig_latitude(lat):
+    """Retorna o par (seno, cosseno) da latitude (em graus), calculado uma única vez por latitude."""
+    lat_rad = math.radians(lat)
+    return math.sin(lat_rad), math.cos(lat_rad)
+
+
+def _bearing(t1, t2, d_lon):
+    """Calcula a direção (ângulo) a partir dos pares (seno, cosseno) já calculados das latitudes."""
+    sin_lat1, cos_lat1 = t1
+    sin_lat2, cos_lat2 = t2
+    d_lon = math.radians(d_lon)
+    x = cos_lat2 * math.sin(d_lon)
+    y = cos_lat1 * sin_lat2 - sin_lat1 * cos_lat2 * math.cos(d_lon)
+    return math.degrees(math.atan2(x, y))
+
+
+@lru_cache(maxsize=4096)
 def calcular_direcao(ponto1, ponto2):
     """Calcula a direção (ângulo) entre dois pontos."""
-    lat1, lon1 = ponto1
-    lat2, lon2 = ponto2
-    d_lon = lon2 - lon1
-    x = math.cos(math.radians(lat2)) * math.sin(math.radians(d_lon))
-    y = math.cos(math.radians(lat1)) * math.sin(math.radians(lat2)) - math.sin(math.radians(lat1)) * math.cos(
-        math.radians(lat2)) * math.cos(math.radians(d_lon))
-    return math.degrees(math.atan2(x, y))
+    return _bearing(_trig_latitude(ponto1[0]), _trig_latitude(ponto2[0]), ponto2[1] - ponto1[1])
 
 
 def extrair_nomes_das_ruas(data, coordenadas):
@@ -122,27 +152,28 @@ coordenadas = [
     (-22.898303, -43.181057)
 ]
 
-# Faz o map matching dos pontos GPS
-dados_map_matching = fazer_map_matching(coordenadas, api_key, profile="driving-car")
 
-if dados_map_matching:
-    # Extrai as coordenadas corrigidas após o map matching
-    coordenadas_corrigidas = [
-        (coord[1], coord[0]) for coord in dados_map_matching["features"][0]["geometry"]["coordinates"]
-    ]
+async def main():
+    grafo = carregar_grafo()
 
-    # Obtém a rota para carro usando as coordenadas corrigidas
-    rota = obter_rota_openrouteservice(coordenadas_corrigidas, api_key, profile="walking")
+    # Um único cliente HTTP/2 para todas as requisições ao OpenRouteService
+    async with httpx.AsyncClient(http2=True, timeout=30) as client:
+        # Faz o map matching dos pontos GPS
+        coordenadas_corrigidas = fazer_map_matching(grafo, coordenadas)
 
-    if rota:
-        # Extrai os nomes das ruas
-        nomes_ruas = extrair_nomes_das_ruas(rota, coordenadas_corrigidas)
+        # Obtém a rota para carro usando as coordenadas corrigidas
+        rota = await obter_rota_openrouteservice(client, coordenadas_corrigidas, api_key, profile="walking")
 
-        # Exibe o resultado
-        print("Ruas pelas quais o trajeto passa (carro):")
-        for rua in nomes_ruas:
-            print(rua)
-    else:
-        print("Não foi possível obter a rota.")
-else:
-    print("Não foi possível fazer o map matching.")
\ No newline at end of file
+        if rota:
+            # Extrai os nomes das ruas
+            nomes_ruas = extrair_nomes_das_ruas(rota, coordenadas_corrigidas)
+
+            # Exibe o resultado
+            print("Ruas pelas quais o trajeto passa (carro):")
+            for rua in nomes_ruas:
+                print(rua)
+        else:
+            print("Não foi possível obter a rota.")
+
+
+asyncio.run(main())
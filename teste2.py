@@ -1,24 +1,65 @@
-import json
+import asyncio
+import aiohttp
+import ijson
 import math
+import numpy as np
+import orjson
 import requests
 import time
+from aiolimiter import AsyncLimiter
+from requests.adapters import HTTPAdapter
+from rtree import index
 from typing import List, Dict, Tuple, Optional
+from urllib3.util.retry import Retry
 import sqlite3
 
 
 class BusRouteNavigator:
     # Tipos de via inadequados para ônibus (conforme documentação OSM)
-    UNSUITABLE_WAYS = {
+    UNSUITABLE_WAYS = frozenset({
         'cycleway', 'footway', 'path', 'pedestrian', 'steps', 'track',
         'bridleway', 'raceway', 'bus_guideway', 'escape', 'service'
-    }
+    })
+
+    # Requisições por segundo ao Nominatim (1 no servidor público; pode ser maior em instância própria)
+    NOMINATIM_RATE_LIMIT = 1
+
+    # Fator de quantização das chaves do cache (1e5 ≈ 1 m): pontos muito próximos compartilham a mesma linha
+    COORD_PRECISION = 1e5
+
+    EARTH_RADIUS = 6371000  # Raio da Terra em metros
+
+    # Arestas acima desta distância (m) usam haversine; abaixo, a aproximação equiretangular é suficiente
+    EQUIRECT_MAX_DISTANCE = 10_000
+
+    NOMINATIM_REVERSE_URL = 'https://nominatim.openstreetmap.org/reverse'
+    OVERPASS_URL = 'https://overpass-api.de/api/interpreter'
+
+    # Valores da tag highway que não representam vias existentes e ficam fora da consulta ao Overpass.
+    # As vias inadequadas (UNSUITABLE_WAYS) continuam na consulta, para que sejam reconhecidas e descartadas
+    OVERPASS_EXCLUDED_HIGHWAYS = '^(construction|proposed|platform|abandoned|razed)$'
+
+    # Distância máxima (m) entre o ponto e a via para aceitar o resultado do Overpass
+    OVERPASS_MAX_DISTANCE = 30
+
+    # Diferença de distância (m) até a qual uma via com nome é preferida à via mais próxima sem nome
+    OVERPASS_NAME_TOLERANCE = 3
+
+    # Margem (em graus, ≈ 100 m) adicionada à área consultada no Overpass
+    OVERPASS_BBOX_MARGIN = 0.001
 
     def __init__(self, geojson_path: str, cache_db: str = 'bus_street_names_cache.db'):
         self.geojson_path = geojson_path
         self.cache_db = cache_db
 
-        with open(geojson_path) as f:
-            self.geojson = json.load(f)
+        # Sessão HTTP reutilizada entre as consultas ao Nominatim
+        self.session = requests.Session()
+        self.session.headers.update({'User-Agent': 'BusNavigator/1.0 (seu-email@exemplo.com)'})
+        self.session.mount('https://', HTTPAdapter(
+            pool_connections=4,
+            pool_maxsize=20,
+            max_retries=Retry(total=3, backoff_factor=0.5, status_forcelist=[429, 500, 502, 503, 504])
+        ))
 
         self._init_cache()
         self.segments = self._process_segments()
@@ -26,74 +67,147 @@ class BusRouteNavigator:
     def _init_cache(self):
         """Inicializa o banco de dados SQLite para cache"""
         self.conn = sqlite3.connect(self.cache_db)
+        self.conn.execute('PRAGMA journal_mode=WAL')
+        self.conn.execute('PRAGMA synchronous=NORMAL')
         cursor = self.conn.cursor()
         cursor.execute('''
             CREATE TABLE IF NOT EXISTS street_names (
-                lat REAL,
-                lon REAL,
+                lat INTEGER,
+                lon INTEGER,
                 street_name TEXT,
                 highway_type TEXT,
                 timestamp INTEGER,
                 PRIMARY KEY (lat, lon)
             )
         ''')
+
+        # Migra, uma única vez, as linhas gravadas com chaves em graus (versão 0) para a chave quantizada
+        if cursor.execute('PRAGMA user_version').fetchone()[0] == 0:
+            cursor.execute('''
+                UPDATE OR REPLACE street_names
+                SET lat = CAST(ROUND(lat * ?) AS INTEGER), lon = CAST(ROUND(lon * ?) AS INTEGER)
+            ''', (self.COORD_PRECISION, self.COORD_PRECISION))
+            cursor.execute('PRAGMA user_version = 1')
         self.conn.commit()
 
+        # Comando reutilizado a cada gravação: o sqlite3 mantém a versão compilada em cache por conexão
+        self._insert_sql = '''
+            INSERT OR REPLACE INTO street_names 
+            (lat, lon, street_name, highway_type, timestamp) 
+            VALUES (?, ?, ?, ?, ?)
+        '''
+
+        # Cópia em memória do cache, carregada com uma única consulta; as leituras não tocam no SQLite
+        self._memory_cache = {
+            (lat, lon): (street_name, highway_type)
+            for lat, lon, street_name, highway_type
+            in self.conn.execute('SELECT lat, lon, street_name, highway_type FROM street_names')
+        }
+
+        # Inserções aguardando gravação em lote (ver _flush_cache)
+        self._pending = []
+
     def _process_segments(self) -> List[Dict]:
-        """Processa os segmentos do GeoJSON"""
+        """Processa os segmentos do GeoJSON, lendo o arquivo uma feature por vez"""
         segments = []
-        for feature in self.geojson['features']:
-            coords = feature['geometry']['coordinates']
-            segment = {
-                'id': feature['properties']['id_segmento_int'],
-                'coordinates': coords,
-                'start': coords[0],
-                'end': coords[-1],
-                'length': self._calculate_segment_length(coords)
-            }
-            segments.append(segment)
+        with open(self.geojson_path, 'rb') as f:
+            for feature in ijson.items(f, 'features.item', use_float=True):
+                segments.append(self._build_segment(feature))
         return segments
 
+    def _build_segment(self, feature: Dict) -> Dict:
+        """Monta o segmento a partir de uma feature do GeoJSON"""
+        coords = feature['geometry']['coordinates']
+        return {
+            'id': feature['properties']['id_segmento_int'],
+            'coordinates': coords,
+            'start': coords[0],
+            'end': coords[-1],
+            'mid': coords[len(coords) // 2],  # Ponto usado para identificar a rua do segmento
+            'length': self._calculate_segment_length(coords)
+        }
+
     def _calculate_segment_length(self, coords: List[List[float]]) -> float:
         """Calcula o comprimento de um segmento em metros"""
-        length = 0
-        for i in range(len(coords) - 1):
-            length += self._haversine_distance(coords[i], coords[i + 1])
-        return length
+        # Converte para radianos uma única vez: cada vértice é compartilhado por duas arestas
+        points = np.radians(np.asarray(coords, dtype=np.float64))
+        start, end = points[:-1], points[1:]
+
+        distances = self._equirect_distance(start, end)
+        long_edges = distances > self.EQUIRECT_MAX_DISTANCE
+        if long_edges.any():
+            distances[long_edges] = self._haversine_distance(start[long_edges], end[long_edges])
+
+        return float(distances.sum())
+
+    def _equirect_distance(self, coord1: np.ndarray, coord2: np.ndarray) -> np.ndarray:
+        """
+        Aproxima a distância em metros entre pares de coordenadas [longitude, latitude] em radianos.
+        Usa apenas um cosseno por aresta; adequada para distâncias curtas.
+        """
+        lon1, lat1 = coord1[..., 0], coord1[..., 1]
+        lon2, lat2 = coord2[..., 0], coord2[..., 1]
+
+        x = (lon2 - lon1) * np.cos((lat1 + lat2) * 0.5)
+        y = lat2 - lat1
+
+        return self.EARTH_RADIUS * np.sqrt(x * x + y * y)
+
+    def _haversine_distance(self, coord1: np.ndarray, coord2: np.ndarray) -> np.ndarray:
+        """Calcula a distância em metros entre pares de coordenadas [longitude, latitude] em radianos"""
+        lon1, lat1 = coord1[..., 0], coord1[..., 1]
+        lon2, lat2 = coord2[..., 0], coord2[..., 1]
 
-    def _haversine_distance(self, coord1: List[float], coord2: List[float]) -> float:
-        """Calcula a distância entre duas coordenadas em metros"""
-        lat1, lon1 = coord1[1], coord1[0]
-        lat2, lon2 = coord2[1], coord2[0]
+        delta_phi = lat2 - lat1
+        delta_lambda = lon2 - lon1
 
-        R = 6371000  # Raio da Terra em metros
-        phi1 = math.radians(lat1)
-        phi2 = math.radians(lat2)
-        delta_phi = math.radians(lat2 - lat1)
-        delta_lambda = math.radians(lon2 - lon1)
+        a = (np.sin(delta_phi / 2) ** 2 +
+             np.cos(lat1) * np.cos(lat2) * np.sin(delta_lambda / 2) ** 2)
+        c = 2 * np.arctan2(np.sqrt(a), np.sqrt(1 - a))
 
-        a = (math.sin(delta_phi / 2) ** 2 +
-             math.cos(phi1) * math.cos(phi2) * math.sin(delta_lambda / 2) ** 2)
-        c = 2 * math.atan2(math.sqrt(a), math.sqrt(1 - a))
+        return self.EARTH_RADIUS * c
 
-        return R * c
+    def _quantize(self, lat: float, lon: float) -> Tuple[int, int]:
+        """Converte a coordenada na chave inteira usada pelo cache"""
+        return round(lat * self.COORD_PRECISION), round(lon * self.COORD_PRECISION)
+
+    def _group_by_cache_key(self, coords: List[List[float]]) -> Tuple[List[Tuple[int, int]], Dict]:
+        """
+        Agrupa coordenadas pela chave do cache.
+
+        :param coords: Lista de coordenadas [longitude, latitude]
+        :return: Chave de cada coordenada e dicionário com a primeira coordenada de cada chave
+        """
+        keys = [self._quantize(coord[1], coord[0]) for coord in coords]
+        unique_coords = {}
+        for key, coord in zip(keys, coords):
+            unique_coords.setdefault(key, coord)
+        return keys, unique_coords
 
     def _get_street_info_from_cache(self, lat: float, lon: float) -> Optional[tuple]:
         """Obtém informações da rua do cache"""
-        cursor = self.conn.cursor()
-        cursor.execute('SELECT street_name, highway_type FROM street_names WHERE lat = ? AND lon = ?', (lat, lon))
-        result = cursor.fetchone()
-        return result if result else None
+        return self._memory_cache.get(self._quantize(lat, lon))
 
     def _save_street_info_to_cache(self, lat: float, lon: float, street_name: str, highway_type: str):
-        """Salva informações da rua no cache"""
-        cursor = self.conn.cursor()
-        cursor.execute('''
-            INSERT OR REPLACE INTO street_names 
-            (lat, lon, street_name, highway_type, timestamp) 
-            VALUES (?, ?, ?, ?, ?)
-        ''', (lat, lon, street_name, highway_type, int(time.time())))
-        self.conn.commit()
+        """Salva informações da rua no cache em memória; a gravação no SQLite é feita por _flush_cache"""
+        key = self._quantize(lat, lon)
+        self._memory_cache[key] = (street_name, highway_type)
+        self._pending.append((*key, street_name, highway_type, int(time.time())))
+
+    def _flush_cache(self):
+        """Grava as inserções pendentes no cache em uma única transação"""
+        if not self._pending:
+            return
+
+        with self.conn:
+            self.conn.executemany(self._insert_sql, self._pending)
+        self._pending.clear()
+
+    def close(self):
+        """Grava as inserções pendentes e libera as conexões"""
+        self._flush_cache()
+        self.conn.close()
+        self.session.close()
 
     def get_street_info(self, coord: List[float]) -> Dict:
         """
@@ -107,42 +221,218 @@ class BusRouteNavigator:
         # Tenta obter do cache primeiro
         cached_info = self._get_street_info_from_cache(lat, lon)
         if cached_info:
-            street_name, highway_type = cached_info
-            if highway_type in self.UNSUITABLE_WAYS:
-                return None
-            return {'name': street_name, 'type': highway_type}
+            return self._street_info_from_cache(cached_info)
 
         # Consulta a API do Nominatim
-        url = f"https://nominatim.openstreetmap.org/reverse?format=json&lat={lat}&lon={lon}&zoom=18&addressdetails=1"
-
         try:
             time.sleep(1)  # Respeita o limite da API
-            headers = {'User-Agent': 'BusNavigator/1.0 (seu-email@exemplo.com)'}
-            response = requests.get(url, headers=headers)
+            response = self.session.get(self.NOMINATIM_REVERSE_URL, params=self._nominatim_params(lat, lon),
+                                        timeout=10)
             response.raise_for_status()
 
-            data = response.json()
+            return self._parse_street_info(lat, lon, orjson.loads(response.content))
 
-            # Obtém tipo da via (highway tag do OSM)
-            highway_type = data.get('extratags', {}).get('highway') or \
-                           data.get('address', {}).get('road_type')
+        except Exception as e:
+            print(f"Erro ao obter informações da rua: {e}")
+            return None
 
-            # Se for via inadequada, retorna None
-            if highway_type in self.UNSUITABLE_WAYS:
-                self._save_street_info_to_cache(lat, lon, 'VIA INADEQUADA', highway_type)
-                return None
+    async def get_street_info_async(self, session: aiohttp.ClientSession, limiter: AsyncLimiter,
+                                    coord: List[float]) -> Optional[Dict]:
+        """
+        Versão assíncrona de get_street_info. O limiter controla a taxa de requisições ao Nominatim,
+        permitindo disparar a próxima consulta enquanto a anterior ainda aguarda resposta.
+        """
+        lon, lat = coord[0], coord[1]
 
-            street_name = data.get('address', {}).get('road', 'Rua Desconhecida')
+        cached_info = self._get_street_info_from_cache(lat, lon)
+        if cached_info:
+            return self._street_info_from_cache(cached_info)
 
-            # Salva no cache
-            self._save_street_info_to_cache(lat, lon, street_name, highway_type or 'unknown')
+        params = self._nominatim_params(lat, lon)
 
-            return {'name': street_name, 'type': highway_type}
+        try:
+            async with limiter:
+                async with session.get(self.NOMINATIM_REVERSE_URL, params=params) as response:
+                    response.raise_for_status()
+                    data = orjson.loads(await response.read())
+
+            return self._parse_street_info(lat, lon, data)
 
         except Exception as e:
             print(f"Erro ao obter informações da rua: {e}")
             return None
 
+    async def get_street_infos_async(self, coords: List[List[float]]) -> List[Optional[Dict]]:
+        """
+        Obtém as informações de rua de várias coordenadas de forma concorrente.
+
+        :param coords: Lista de coordenadas [longitude, latitude]
+        :return: Lista com as informações de cada coordenada, na mesma ordem de entrada
+        """
+        # Coordenadas repetidas (ou a menos de ~1 m) são consultadas uma única vez
+        keys, unique_coords = self._group_by_cache_key(coords)
+
+        limiter = AsyncLimiter(self.NOMINATIM_RATE_LIMIT, 1)
+        connector = aiohttp.TCPConnector(limit=10, keepalive_timeout=30)
+        headers = {'User-Agent': 'BusNavigator/1.0 (seu-email@exemplo.com)'}
+        async with aiohttp.ClientSession(connector=connector, headers=headers) as session:
+            tasks = [self.get_street_info_async(session, limiter, coord) for coord in unique_coords.values()]
+            infos = await asyncio.gather(*tasks)
+
+        info_by_key = dict(zip(unique_coords, infos))
+        return [info_by_key[key] for key in keys]
+
+    def _nominatim_params(self, lat: float, lon: float) -> Dict:
+        """Parâmetros da consulta de geocodificação reversa ao Nominatim"""
+        return {'lat': lat, 'lon': lon, 'format': 'json', 'zoom': 18, 'addressdetails': 1, 'extratags': 1}
+
+    def _street_info_from_cache(self, cached_info: tuple) -> Optional[Dict]:
+        """Converte uma linha do cache no dicionário de informações da rua"""
+        street_name, highway_type = cached_info
+        if highway_type in self.UNSUITABLE_WAYS:
+            return None
+        return {'name': street_name, 'type': highway_type}
+
+    def _parse_street_info(self, lat: float, lon: float, data: Dict) -> Optional[Dict]:
+        """Interpreta a resposta do Nominatim e salva o resultado no cache"""
+        address = data.get('address') or {}
+        extratags = data.get('extratags') or {}
+
+        # Obtém tipo da via (highway tag do OSM)
+        highway_type = extratags.get('highway') or address.get('road_type')
+
+        # Se for via inadequada, retorna None
+        if highway_type in self.UNSUITABLE_WAYS:
+            self._save_street_info_to_cache(lat, lon, 'VIA INADEQUADA', highway_type)
+            return None
+
+        street_name = address.get('road', 'Rua Desconhecida')
+
+        # Salva no cache
+        self._save_street_info_to_cache(lat, lon, street_name, highway_type or 'unknown')
+
+        return {'name': street_name, 'type': highway_type}
+
+    def _fetch_overpass_ways(self, coords: List[List[float]]) -> List[Dict]:
+        """Obtém, em uma única consulta ao Overpass, todas as vias na área que contém as coordenadas"""
+        points = np.asarray(coords, dtype=np.float64)[:, :2]
+        west, south = points.min(axis=0) - self.OVERPASS_BBOX_MARGIN
+        east, north = points.max(axis=0) + self.OVERPASS_BBOX_MARGIN
+
+        query = (f'[out:json][timeout:60];'
+                 f'way[highway][highway!~"{self.OVERPASS_EXCLUDED_HIGHWAYS}"]({south},{west},{north},{east});'
+                 f'out geom;')
+
+        try:
+            response = self.session.post(self.OVERPASS_URL, data={'data': query}, timeout=90)
+            response.raise_for_status()
+            elements = orjson.loads(response.content).get('elements', [])
+            return [way for way in elements if len(way.get('geometry', [])) >= 2]
+
+        except Exception as e:
+            print(f"Erro ao consultar o Overpass: {e}")
+            return []
+
+    def _build_street_index(self, ways: List[Dict]) -> Tuple[index.Index, List[Tuple[int, Dict, Dict]]]:
+        """
+        Cria uma R-tree com os trechos (pares de nós consecutivos) de cada via.
+
+        :return: Índice espacial e lista de trechos (via, nó inicial, nó final), na ordem dos ids da R-tree
+        """
+        pieces = []
+        for way_id, way in enumerate(ways):
+            nodes = way['geometry']
+            pieces.extend((way_id, a, b) for a, b in zip(nodes, nodes[1:]))
+
+        def entries():
+            for piece_id, (_, a, b) in enumerate(pieces):
+                bbox = (min(a['lon'], b['lon']), min(a['lat'], b['lat']),
+                        max(a['lon'], b['lon']), max(a['lat'], b['lat']))
+                yield piece_id, bbox, None
+
+        return index.Index(entries()), pieces
+
+    def _distance_to_piece(self, lon: float, lat: float, a: Dict, b: Dict) -> float:
+        """Distância em metros entre o ponto e o trecho a-b (projeção equiretangular local)"""
+        scale = math.cos(math.radians(lat))
+        ax, ay = (a['lon'] - lon) * scale, a['lat'] - lat
+        bx, by = (b['lon'] - lon) * scale, b['lat'] - lat
+        dx, dy = bx - ax, by - ay
+
+        # Posição, ao longo do trecho, do ponto mais próximo da origem (o próprio ponto consultado)
+        length2 = dx * dx + dy * dy
+        t = 0.0 if length2 == 0 else min(1.0, max(0.0, -(ax * dx + ay * dy) / length2))
+
+        return self.EARTH_RADIUS * math.radians(math.hypot(ax + t * dx, ay + t * dy))
+
+    def _nearest_way(self, street_index: index.Index, pieces: List[Tuple[int, Dict, Dict]],
+                     ways: List[Dict], lon: float, lat: float) -> Optional[Dict]:
+        """
+        Encontra a via mais próxima do ponto, dentro de OVERPASS_MAX_DISTANCE. Se a mais próxima for
+        adequada mas não tiver nome, usa a via adequada com nome mais próxima dentro de OVERPASS_NAME_TOLERANCE.
+
+        :return: A via encontrada, ou None se nenhuma estiver próxima o suficiente
+        """
+        delta_lat = math.degrees(self.OVERPASS_MAX_DISTANCE / self.EARTH_RADIUS)
+        delta_lon = delta_lat / math.cos(math.radians(lat))
+        search_box = (lon - delta_lon, lat - delta_lat, lon + delta_lon, lat + delta_lat)
+
+        # Menor distância real (ponto-segmento) de cada via candidata
+        distances = {}
+        for piece_id in street_index.intersection(search_box):
+            way_id, a, b = pieces[piece_id]
+            distance = self._distance_to_piece(lon, lat, a, b)
+            if distance <= self.OVERPASS_MAX_DISTANCE and distance < distances.get(way_id, math.inf):
+                distances[way_id] = distance
+
+        if not distances:
+            return None
+
+        nearest = min(distances, key=distances.get)
+        tags = ways[nearest].get('tags', {})
+        if 'name' in tags or tags.get('highway') in self.UNSUITABLE_WAYS:
+            return ways[nearest]
+
+        named = [
+            way_id for way_id, distance in distances.items()
+            if distance <= distances[nearest] + self.OVERPASS_NAME_TOLERANCE
+            and 'name' in ways[way_id].get('tags', {})
+            and ways[way_id]['tags'].get('highway') not in self.UNSUITABLE_WAYS
+        ]
+        return ways[min(named, key=distances.get)] if named else ways[nearest]
+
+    def preload_street_cache(self, coords: List[List[float]]):
+        """
+        Pré-carrega o cache com a via mais próxima de cada coordenada, usando uma única consulta
+        ao Overpass em vez de uma requisição ao Nominatim por ponto. Coordenadas já presentes no cache, sem
+        via próxima o suficiente ou não resolvidas por falha do Overpass seguem para o Nominatim normalmente.
+
+        :param coords: Lista de coordenadas [longitude, latitude]
+        """
+        missing = [coord for coord in coords if not self._get_street_info_from_cache(coord[1], coord[0])]
+        if not missing:
+            return
+
+        ways = self._fetch_overpass_ways(missing)
+        if not ways:
+            return
+
+        street_index, pieces = self._build_street_index(ways)
+
+        for coord in missing:
+            lon, lat = coord[0], coord[1]
+            way = self._nearest_way(street_index, pieces, ways, lon, lat)
+            if way is None:
+                continue
+
+            tags = way.get('tags', {})
+            highway_type = tags['highway']
+
+            if highway_type in self.UNSUITABLE_WAYS:
+                self._save_street_info_to_cache(lat, lon, 'VIA INADEQUADA', highway_type)
+            else:
+                self._save_street_info_to_cache(lat, lon, tags.get('name', 'Rua Desconhecida'), highway_type)
+
     def get_bus_route_streets(self) -> List[Dict]:
         """
         Retorna as ruas adequadas para ônibus na ordem do percurso.
@@ -150,11 +440,18 @@ class BusRouteNavigator:
         route_streets = []
         current_street = None
 
-        for segment in self.segments:
-            # Obtém informações no ponto médio do segmento
-            mid_point = segment['coordinates'][len(segment['coordinates']) // 2]
-            street_info = self.get_street_info(mid_point)
+        # Pontos médios que caem na mesma chave do cache (~1 m) são resolvidos uma única vez
+        mid_points = [segment['mid'] for segment in self.segments]
+        keys, unique_points = self._group_by_cache_key(mid_points)
 
+        # Obtém, de forma concorrente, as informações de cada ponto único
+        self.preload_street_cache(list(unique_points.values()))
+        street_infos = asyncio.run(self.get_street_infos_async(list(unique_points.values())))
+        self._flush_cache()
+        info_by_key = dict(zip(unique_points, street_infos))
+
+        for segment, key in zip(self.segments, keys):
+            street_info = info_by_key[key]
             if not street_info:
                 continue  # Ignora vias inadequadas
 
@@ -195,24 +492,30 @@ class BusRouteNavigator:
         """
         bus_streets = self.get_bus_route_streets()
 
+        # Monta o relatório em memória e grava de uma só vez
+        parts = [
+            "RELATÓRIO DE ROTAS PARA ÔNIBUS\n",
+            "===============================\n\n",
+            f"Arquivo GeoJSON processado: {self.geojson_path}\n",
+            f"Total de ruas adequadas: {len(bus_streets)}\n\n",
+            "DETALHES DO TRAJETO:\n",
+            "--------------------\n",
+        ]
+
+        for i, street in enumerate(bus_streets, 1):
+            parts.append(
+                f"\n{i}. {street['name']}\n"
+                f"   Tipo de via: {street['type'] or 'Não especificado'}\n"
+                f"   Extensão: {street['length']:.0f} metros\n"
+                f"   Segmentos: {', '.join(street['segments'])}\n"
+                f"   Início: {street['start'][1]}, {street['start'][0]}\n"
+                f"   Fim: {street['end'][1]}, {street['end'][0]}\n"
+            )
+
+        parts.append("\nOBS: Foram filtradas ciclovias, vias pedestres e outros tipos inadequados.\n")
+
         with open(output_file, 'w', encoding='utf-8') as f:
-            f.write("RELATÓRIO DE ROTAS PARA ÔNIBUS\n")
-            f.write("===============================\n\n")
-            f.write(f"Arquivo GeoJSON processado: {self.geojson_path}\n")
-            f.write(f"Total de ruas adequadas: {len(bus_streets)}\n\n")
-
-            f.write("DETALHES DO TRAJETO:\n")
-            f.write("--------------------\n")
-
-            for i, street in enumerate(bus_streets, 1):
-                f.write(f"\n{i}. {street['name']}\n")
-                f.write(f"   Tipo de via: {street['type'] or 'Não especificado'}\n")
-                f.write(f"   Extensão: {street['length']:.0f} metros\n")
-                f.write(f"   Segmentos: {', '.join(street['segments'])}\n")
-                f.write(f"   Início: {street['start'][1]}, {street['start'][0]}\n")
-                f.write(f"   Fim: {street['end'][1]}, {street['end'][0]}\n")
-
-            f.write("\nOBS: Foram filtradas ciclovias, vias pedestres e outros tipos inadequados.\n")
+            f.write(''.join(parts))
 
         print(f"Relatório gerado em '{output_file}'")
 